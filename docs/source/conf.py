@@ -11,9 +11,7 @@ copyright = '2023, Alan Brammer'
 author = 'Alan Brammer'
 release = 'v0.0.1'
 
-import sys
-from pathlib import Path
-sys.path.insert(0, str((Path(__file__).parent.parent.parent / 'src' ).resolve()))
+# tciopy is imported from the installed package (a regular pip install of the repo root), see readthedocs.yaml
 
 # -- General configuration ---------------------------------------------------
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#general-configuration
@@ -1,5 +1,5 @@
-from tciopy.atcf.abdeck import read_adeck, read_bdeck
+from tciopy.atcf.abdeck import read_adeck, read_adecks, read_bdeck
 from tciopy.atcf.fdeck import read_fdeck
 from tciopy.cxml.reader import read_cxml
 
-__all__ = ["read_adeck", "read_bdeck", "read_fdeck", "read_cxml"]
+__all__ = ["read_adeck", "read_adecks", "read_bdeck", "read_fdeck", "read_cxml"]
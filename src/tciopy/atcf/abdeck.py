@@ -1,88 +1,127 @@
 """
 Read and write ATCF a or b deck files
 """
-import gzip
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 # from dataclasses import dataclass
 # from datetime import datetime
 from pathlib import Path
-from itertools import zip_longest
+from typing import Optional
 import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-from tciopy.atcf.decks import ADeck
-# from tciopy.converters import DatetimeConverter, IntConverter, LatLonConverter, StrConverter
-from tciopy.converters import datetimeconverter, int_converter, latlonconverter
+from tciopy.atcf.decks import ADeck, open_deck, tokenize_deck
 
+#: Quadrant wind radii columns as read, before they are spread per wind threshold
+_QUADRANT_COLS = ("rad_NEQ", "rad_SEQ", "rad_SWQ", "rad_NWQ")
+#: Columns identifying a single forecast point, adeck lines are collapsed over these
+_GROUPER_COLS = ["basin", "number", "datetime", "tech", "tau"]
+#: Per-line columns that don't survive the collapse
+_EXCLUDE_COLS = ("rad", "windcode")
+#: Raw columns read_adeck always needs, whichever columns are asked for
+_REQUIRED_COLS = (*_GROUPER_COLS, "tnum", "rad", *_QUADRANT_COLS)
+#: Wind radii columns as spread per wind threshold, e.g. rad34_NEQ
+_WIND_RADII = re.compile(r"rad\d+_(NEQ|SEQ|SWQ|NWQ)")
+_AGGMETHOD = {
+    "object": "first",
+    "int64": "mean",
+    "float64": "mean",
+    "datetime64[ns]": "first",
+}
 
-def read_adeck(fname: str):
-    """Read adeck from filename into pandas dataframe"""
-    # Tried versions of parsing colums in the read_csv func and they were much
-    # slower
-    if isinstance(fname, str):
-        fname = Path(fname)
 
-    # n.b. ' *, *' takes care of stripping whitespace
-    #  python engine allows for providing too many column names
-    #  datetime as converter is super slow, str2ll is neglible time addition
-    if fname.suffix == ".gz":
-        opener = gzip.open
-    else:
-        opener = open
-    alldata = ADeck()
-    # alldata = AdeckEntry()
-    with opener(fname, mode="rt", newline="\n") as io_file:
-        for line in io_file:
-            splitline = re.split(r",\s*", line.rstrip("\n"), maxsplit=44)
-            alldata.append(splitline)
-
-    datum = alldata.to_dataframe()
-
-    # for key, converter in converters.items():
-    #     datum[key] = datum[key].apply(converter)
-    # datum = datum.loc[(datum["lat"] != 0) | (datum["lon"] != 0)]
+def read_adeck(fname: str, columns: Optional[list[str]] = None):
+    """Read adeck from filename into pandas dataframe
+       columns limits the output to those columns, the other raw columns are
+       then not parsed. Wind radii columns (radNN_NEQ, ...) that don't occur
+       in the file come back as all NaN, other unknown columns raise a KeyError.
+    """
+    rawcols = None
+    if columns is not None:
+        rawcols = ADeck()._colnames
+        known = {*rawcols, "index", "validtime"}.difference(_EXCLUDE_COLS, _QUADRANT_COLS)
+        unknown = [col for col in columns if col not in known and not _WIND_RADII.fullmatch(col)]
+        if unknown:
+            raise KeyError(f"Unknown adeck columns: {unknown}")
+        rawcols = [col for col in rawcols if col in _REQUIRED_COLS or col in columns]
+    datum = _read_raw_adeck(fname, rawcols).to_dataframe()
 
     #  Quicker to process dates in series after than as a converter
     # datum["datetime"] = pd.to_datetime(datum["datetime"], format="%Y%m%d%H")
-    best_lines = datum["tech"] == "BEST"
-    datum.loc[best_lines, "datetime"] = (
-        pd.to_timedelta(datum.loc[best_lines, "tnum"].fillna(0), unit="m")
-        + datum.loc[best_lines, "datetime"]
-    )
-    datum.loc[best_lines, "tnum"] = datum.loc[best_lines, "tnum"].fillna(0)
+    # BEST lines carry minutes in tnum, fold them into datetime
+    best_lines = (datum["tech"] == "BEST").to_numpy()
+    tnum = datum["tnum"].to_numpy()
+    best_tnum = np.where(best_lines, np.nan_to_num(tnum), tnum)
+    datum["datetime"] += pd.to_timedelta(np.where(best_lines, best_tnum, 0), unit="m")
+    datum["tnum"] = best_tnum
     datum["validtime"] = datum["datetime"] + pd.to_timedelta(datum["tau"], unit="h")
 
-    datum.loc[((datum[['rad_NWQ', 'rad_NEQ', 'rad_SEQ', 'rad_SWQ']] == 0).sum(axis=1) == 4), ['rad_NWQ', 'rad_NEQ', 'rad_SEQ', 'rad_SWQ']] =  np.nan
-    def rename_quadrants(group):
-        key = group.name
-        key = pd.to_numeric(key)
-        if key == 0:
-            key=34
-        ngroup = group.rename(columns={'rad_NEQ': f'rad{key:2.0f}_NEQ','rad_NWQ': f'rad{key:2.0f}_NWQ','rad_SEQ': f'rad{key:2.0f}_SEQ','rad_SWQ': f'rad{key:2.0f}_SWQ' })
-        return ngroup.reset_index()
-    datum = datum.groupby('rad', observed=True).apply(rename_quadrants)
-
-    aggmethod = {
-        "object": "first",
-        "int64": "mean",
-        "float64": "mean",
-        "datetime64[ns]": "first",
+    quadrants = list(_QUADRANT_COLS)
+    quadrant_radii = datum[quadrants].to_numpy(dtype=float)
+    # lines with all radii zero carry no radii at all
+    has_radii = ~(quadrant_radii == 0).all(axis=1)
+
+    # Spread the quadrant radii into one set of columns per wind threshold (rad 0 is 34kt),
+    #  masked to the rows of that threshold, so a single groupby below collapses them.
+    #  rad is categorical, so only its few categories are decoded and the codes index into them.
+    thresholds = pd.to_numeric(datum["rad"].cat.categories, errors="coerce").to_numpy(dtype=float)
+    thresholds = np.append(np.where(thresholds == 0, 34, thresholds), np.nan)
+    windrad = thresholds[datum["rad"].cat.codes.to_numpy()]  # code -1 (missing) picks the NaN
+    kts = np.unique(windrad[~np.isnan(windrad)])
+    on_threshold = (windrad[:, None] == kts) & has_radii[:, None]
+    radii = np.where(on_threshold[:, :, None], quadrant_radii[:, None, :], np.nan)
+    radii = pd.DataFrame(
+        radii.reshape(len(datum), len(kts) * len(quadrants)),
+        columns=[f"rad{kt:2.0f}_{quad[4:]}" for kt in kts for quad in quadrants],
+    )
+    # lowest threshold replaces the raw quadrant columns, higher thresholds go on the end
+    position = datum.columns.get_loc(quadrants[0])
+    datum = pd.concat(
+        [
+            datum.iloc[:, :position],
+            radii.iloc[:, :4],
+            datum.iloc[:, position + 4 :],
+            radii.iloc[:, 4:],
+        ],
+        axis=1,
+    ).reset_index()
+
+    agg_dict = {
+        index: _AGGMETHOD.get(str(dtype), "first")
+        for index, dtype in datum.dtypes.items()
+        if index not in _EXCLUDE_COLS
     }
-    agg_dict = {index: aggmethod.get(str(dtype), "first") for index, dtype in datum.dtypes.items()}
     decker = (
-        datum.groupby(["basin", "number", "datetime", "tech", "tau"], observed=True)
+        datum.groupby(_GROUPER_COLS, observed=True)
         .aggregate(agg_dict)
         .reset_index(drop=True)
     )
-    decker.drop(
-        columns=["rad", "windcode", ], inplace=True
-    )
 
     # stretch out the stormname, across neighboring rows.
-    decker["stormname"] =  decker["stormname"].ffill()
-    decker["stormname"] =  decker["stormname"].bfill()
-    
-    return decker.reset_index(drop=True)
+    #  names change over a storm's life (INVEST -> BRET), so this fills rather than
+    #  picking one name per storm; most decks have no missing names at all.
+    if "stormname" in decker and decker["stormname"].hasnans:
+        decker["stormname"] = decker["stormname"].ffill().bfill()
+
+    if columns is not None:
+        decker = decker.reindex(columns=columns)
+    return decker
+
+
+def _read_raw_adeck(fname, columns=None):
+    """Tokenize an adeck file into an ADeck of raw string columns, optionally only some of them"""
+    # Tokenize with the pandas C parser; every field is kept as a raw string and
+    # the ADeck columns do the (vectorized) conversion afterwards.
+    #  Short lines are padded with "", fields beyond the ADeck columns are dropped.
+    #  The tokenized frame only lives in this scope, so it is freed before conversion.
+    alldata = ADeck()
+    with open_deck(fname) as io_file:
+        raw = tokenize_deck(io_file)
+    alldata.from_fields(raw, columns)
+    return alldata
 
 
 def read_bdeck(fname: str):
@@ -90,224 +129,156 @@ def read_bdeck(fname: str):
     return read_adeck(fname)
 
 
-class AdeckEntry:
-    def __init__(self):
-        self.data_store = {
-            "basin": {
-                "data": [],
-            },
-            "number": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "datetime": {
-                "data": [],
-                "converter": datetimeconverter(datetime_format="%Y%m%d%H"),
-            },
-            "tnum": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "tech": {
-                "data": [],
-            },
-            "tau": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "lat": {
-                "data": [],
-                "converter": latlonconverter(scale=0.1),
-            },
-            "lon": {
-                "data": [],
-                "converter": latlonconverter(scale=0.1),
-            },
-            "vmax": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "mslp": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "type": {
-                "data": [],
-            },
-            "rad": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "windcode": {
-                "data": [],
-            },
-            "rad_NEQ": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "rad_SEQ": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "rad_SWQ": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "rad_NWQ": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "pouter": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "router": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "rmw": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "gusts": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "eye": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "subregion": {
-                "data": [],
-            },
-            "maxseas": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "initials": {
-                "data": [],
-            },
-            "direction": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "speed": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "stormname": {
-                "data": [],
-            },
-            "depth": {
-                "data": [],
-            },
-            "seas": {"data": [], "converter": int_converter()},
-            "seascode": {
-                "data": [],
-            },
-            "seas1": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "seas2": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "seas3": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "seas4": {
-                "data": [],
-                "converter": int_converter(),
-            },
-            "userdefined1": {
-                "data": [],
-            },
-            "userdata1": {
-                "data": [],
-            },
-            "userdefined2": {
-                "data": [],
-            },
-            "userdata2": {
-                "data": [],
-            },
-            "userdefined3": {
-                "data": [],
-            },
-            "userdata3": {
-                "data": [],
-            },
-            "userdefined4": {
-                "data": [],
-            },
-            "userdata4": {
-                "data": [],
-            },
-            "userdefined5": {
-                "data": [],
-            },
-            "userdata5": {
-                "data": [],
-            },
-        }
-
-    def append(self, values):
-        for key, val in zip_longest(self.data_store.keys(), values, fillvalue=""):
-            self.data_store[key]["data"].append(val)
-
-    def pd_parse(self, key, converter, raw_data):
-        if "converter" in converter:
-            raw_data[key] = converter['converter'](raw_data[key])
-
-    def to_dataframe(self):
-        raw_data = {
-            key: np.array(self.data_store[key]["data"], dtype=object) for key in self.data_store
-        }
-        for key, converter in self.data_store.items():
-            self.pd_parse(key, converter, raw_data)
-            # if "converter" in converter:
-                # raw_data[key] = self.pd_parse(converter, raw_data[key])
-        return pd.DataFrame(raw_data)
+def read_adecks(fnames, max_workers=None, columns: Optional[list[str]] = None):
+    """Read several adeck files into one pandas dataframe
+       With more than one worker (by default one per file, up to the number of CPUs),
+       the files are parsed in a process pool and handed to the workers in batches.
+       With a single worker they are parsed one after another in the calling process.
+       columns is passed on to read_adeck for every file.
+    """
+    fnames = list(fnames)
+    if not fnames:
+        raise ValueError("read_adecks needs at least one file to read")
+    reader = partial(read_adeck, columns=columns)
+    if max_workers is None:
+        max_workers = min(len(fnames), os.cpu_count() or 1)
+    if max_workers <= 1:
+        # not worth spinning up a pool for a single file / core
+        decks = [reader(fname) for fname in fnames]
+    else:
+        # the files are spread over the workers a few at a time, to cut down on
+        #  the round trips and pickling of the parsed frames back to this process
+        chunksize = max(1, len(fnames) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            decks = list(executor.map(reader, fnames, chunksize=chunksize))
+    return _concat_decks(decks)
+
+
+def _concat_decks(decks):
+    """Concatenate deck dataframes, keeping categorical columns categorical across files"""
+    # Give every frame the union of categories first, that only remaps the integer codes
+    #  and lets concat stitch the codes together instead of falling back to object values.
+    categories = {
+        col: union_categoricals([deck[col] for deck in decks if col in deck]).categories
+        for col, dtype in decks[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    #  The frames are our own, so the columns are swapped in place rather than copying
+    #  every frame with assign, that keeps the peak at the decks plus the result.
+    for deck in decks:
+        for col, cats in categories.items():
+            if col in deck:
+                deck[col] = deck[col].cat.set_categories(cats)
+    return pd.concat(decks, ignore_index=True, copy=False)
+
 
 def write_adeck(outf, deck):
-    for row in deck.itertuples():
-        for line in format_adeck_line(row):
-            line = line[:95] + re.sub(r"(, )[\s,0]+$", ", ", line[95:])
-            line = line.rstrip(r"\n")
-            outf.write(f"{line}\n")
-    
-def fillnan(val, nafill=0):
-    if pd.isna(val):
-        return nafill
-    return val
-
-def format_adeck_line(row):
-    """Format a single row of a dataframe into an adeck line"""
-    for kt in 34, 50, 64:
-        rad1 = np.max([getattr(row, f"rad{kt}_NEQ", 0), 0])
-        rad2 = np.max([getattr(row, f"rad{kt}_SEQ", 0), 0])
-        rad3 = np.max([getattr(row, f"rad{kt}_SWQ", 0), 0])
-        rad4 = np.max([getattr(row, f"rad{kt}_NWQ", 0), 0])
-        if (kt > 34) and ((set([rad1, rad2, rad3, rad4]) == {0}) or pd.isnull([rad1, rad2, rad3, rad4]).all()):
-            continue
-        line = (
-            f"{row.basin}, {row.number:>2}, {row.datetime:%Y%m%d%H}, "
-            f"{row.tnum:02.0f}, {row.tech:>4}, {row.tau:3.0f}, "
-            f"{fillnan(abs(row.lat)*10):3.0f}{'N' if row.lat>0 else 'S'}, "
-            f"{fillnan(abs(row.lon)*10):4.0f}{'E' if row.lon>0 else 'W'},"
-            f"{fillnan(row.vmax):4.0f}, {fillnan(row.mslp):4.0f}, {row.type:>2}, "
-            f"{kt:3}, NEQ, {fillnan(rad1):4.0f}, {fillnan(rad2):4.0f}, {fillnan(rad3):4.0f}, {fillnan(rad4):4.0f}, "
-            f"{fillnan(row.pouter):4.0f}, {fillnan(row.router):4.0f}, {fillnan(row.rmw):3.0f}, {fillnan(row.gusts):3.0f}, "
-            f"{fillnan(row.eye):3.0f},{row.subregion:>4},{fillnan(row.maxseas):4.0f}, {row.initials:>3}, "
-            f"{fillnan(row.direction):3.0f},{fillnan(row.speed):4.0f}, {row.stormname:>10}, {row.depth:>1}, "
-            f"{fillnan(row.seas):4.0f}, {row.seascode:>3}, {fillnan(row.seas1):4.0f}, {fillnan(row.seas2):4.0f}, "
-            f"{fillnan(row.seas3):4.0f}, {fillnan(row.seas4):4.0f}, {row.userdefined1:>4}, {row.userdata1:>4}, "
-            f"{row.userdefined2:>4}, {row.userdata2:>4}, {row.userdefined3:>4}, {row.userdata3:>4}, "
-            f"{row.userdefined4:>4}, {row.userdata4:>4}, {row.userdefined5:>4}, {row.userdata5:>4}"
+    """Write a dataframe of adeck entries to an open text file"""
+    lines = format_adeck_lines(deck)
+    # one write per chunk of lines, rather than one per line
+    for start in range(0, len(lines), _WRITE_CHUNK):
+        outf.write("\n".join(lines[start : start + _WRITE_CHUNK]) + "\n")
+
+
+#: Per-line format, split around the wind radii so the common fields are formatted once per row
+_ADECK_HEAD = "%s, %2s, %s, %02.0f, %4s, %3.0f, %3.0f%s, %4.0f%s,%4.0f, %4.0f, %2s, "
+_ADECK_RADII = "%3d, NEQ, %4.0f, %4.0f, %4.0f, %4.0f, "
+_ADECK_TAIL = (
+    "%4.0f, %4.0f, %3.0f, %3.0f, %3.0f,%4s,%4.0f, %3s, %3.0f,%4.0f, %10s, %1s, "
+    "%4.0f, %3s, %4.0f, %4.0f, %4.0f, %4.0f, "
+    "%4s, %4s, %4s, %4s, %4s, %4s, %4s, %4s, %4s, %4s"
+)
+_TRAILING_EMPTY = re.compile(r"(, )[\s,0]+$")
+#: Number of lines joined into a single write by write_adeck
+_WRITE_CHUNK = 65536
+
+
+# numeric columns go to the formatter as python floats, %-formatting numpy scalars is much slower
+def _filled(deck, column, nafill=0):
+    return deck[column].fillna(nafill).to_numpy().tolist()
+
+
+def _objects(deck, column):
+    return deck[column].to_numpy(dtype=object)
+
+
+# a deck only has a handful of distinct times, format each of them once
+def _strftime(deck, column, datetime_format):
+    codes, uniques = pd.factorize(deck[column])
+    formatted = np.append(uniques.strftime(datetime_format).to_numpy(dtype=object), np.nan)
+    return formatted[codes]
+
+
+def format_adeck_lines(deck):
+    """Format a dataframe into adeck lines.
+       Columns are prepared as whole arrays and each row yields a 34 kt line, plus
+       50 and 64 kt lines when those radii are set.
+    """
+    nrows = len(deck)
+    lat = deck["lat"].to_numpy()
+    lon = deck["lon"].to_numpy()
+    head = map(
+        _ADECK_HEAD.__mod__,
+        zip(
+            _objects(deck, "basin"),
+            _objects(deck, "number"),
+            _strftime(deck, "datetime", "%Y%m%d%H"),
+            deck["tnum"].to_numpy().tolist(),
+            _objects(deck, "tech"),
+            deck["tau"].to_numpy().tolist(),
+            np.nan_to_num(np.abs(lat) * 10).tolist(),
+            np.where(lat > 0, "N", "S").tolist(),
+            np.nan_to_num(np.abs(lon) * 10).tolist(),
+            np.where(lon > 0, "E", "W").tolist(),
+            _filled(deck, "vmax"),
+            _filled(deck, "mslp"),
+            _objects(deck, "type"),
+        ),
+    )
+    tail = map(
+        _ADECK_TAIL.__mod__,
+        zip(
+            _filled(deck, "pouter"),
+            _filled(deck, "router"),
+            _filled(deck, "rmw"),
+            _filled(deck, "gusts"),
+            _filled(deck, "eye"),
+            _objects(deck, "subregion"),
+            _filled(deck, "maxseas"),
+            _objects(deck, "initials"),
+            _filled(deck, "direction"),
+            _filled(deck, "speed"),
+            _objects(deck, "stormname"),
+            _objects(deck, "depth"),
+            _filled(deck, "seas"),
+            _objects(deck, "seascode"),
+            _filled(deck, "seas1"),
+            _filled(deck, "seas2"),
+            _filled(deck, "seas3"),
+            _filled(deck, "seas4"),
+            *(_objects(deck, f"user{kind}{i}") for i in range(1, 6) for kind in ("defined", "data")),
+        ),
+    )
+    head = np.fromiter(head, dtype=object, count=nrows)
+    tail = np.fromiter(tail, dtype=object, count=nrows)
+
+    lines = np.empty((nrows, 3), dtype=object)
+    keep = np.ones((nrows, 3), dtype=bool)
+    for i, kt in enumerate((34, 50, 64)):
+        radii = np.column_stack(
+            [
+                np.fmax(deck[col].to_numpy(dtype=float), 0) if col in deck else np.zeros(nrows)
+                for col in (f"rad{kt}_{quad}" for quad in ("NEQ", "SEQ", "SWQ", "NWQ"))
+            ]
         )
-        yield line
+        if kt > 34:
+            keep[:, i] = ~((radii == 0).all(axis=1) | np.isnan(radii).all(axis=1))
+        radii = map(_ADECK_RADII.__mod__, ((kt, *rads) for rads in np.nan_to_num(radii).tolist()))
+        lines[:, i] = head + np.fromiter(radii, dtype=object, count=nrows) + tail
+
+    lines = pd.Series(lines[keep])
+    # trim the trailing run of empty / zero fields, keeping the leading fields intact
+    return (lines.str[:95] + lines.str[95:].str.replace(_TRAILING_EMPTY, ", ", regex=True)).tolist()
 
 
 def main(input_filepath):
@@ -326,9 +297,7 @@ def main(input_filepath):
     #     adeck_name = f"a{key[0].lower()}{key[1]}{key[2]:%Y}.dat"
     #     output_filepath = pathlib.Path(output_dir, adeck_name)
     #     with open(output_filepath, 'a') as f:
-    #         for datarow in storm.itertuples():
-    #             for line in format_adeck_line(datarow):
-    #                 f.write(f"{line}\n")
+    #         write_adeck(f, storm)
     #     subprocess.call([
     #         "sort", "-u", "-k", "3,3n", "-k", "5,5", "-k", "6,6n", "-k",
     #         "12,12n", output_filepath, "-o", output_filepath
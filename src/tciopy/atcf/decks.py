@@ -1,11 +1,102 @@
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import mmap
+import os
 from functools import cached_property
+from pathlib import Path
 import numpy as np
 import pandas as pd
-from itertools import zip_longest
+from itertools import chain, repeat
 from abc import ABC, abstractmethod
 
 from tciopy.converters import StringColumn, NumericColumn, CategoricalColumn, LatLonColumn, DatetimeColumn
 
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+try:
+    from isal import igzip
+except ImportError:
+    igzip = gzip
+
+
+def _open_gzip(fname):
+    if rapidgzip is not None:
+        return rapidgzip.open(str(fname), parallelization=0)
+    return igzip.open(fname, mode="rb")
+
+
+#: Binary openers for compressed decks, by file suffix
+_DECOMPRESSORS = {
+    ".gz": _open_gzip,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def open_deck(fname):
+    """Open a deck file for binary reading.
+       .gz files are decompressed in parallel with rapidgzip when it is installed,
+       otherwise with ISA-L's igzip (python-isal) or the standard library gzip module.
+       .bz2 and .xz files are decompressed with the standard library.
+       Plain files are memory mapped.
+    """
+    decompressor = _DECOMPRESSORS.get(Path(fname).suffix)
+    if decompressor is not None:
+        return decompressor(fname)
+    with open(fname, mode="rb") as io_file:
+        if os.fstat(io_file.fileno()).st_size == 0:
+            # empty files can't be mapped
+            return io.BytesIO()
+        return mmap.mmap(io_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _max_fields(buffer):
+    """Number of fields on the widest line of the buffer, at least the 9 fields common to the formats"""
+    # Fields per line is one more than the commas between consecutive newlines.
+    #  The array view on the buffer is local to this function, so it is released before
+    #  the buffer is parsed; a live view would keep a memory map from closing, hiding any
+    #  parse error behind a BufferError.
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    commas = np.flatnonzero(data == ord(","))
+    line_ends = np.append(np.flatnonzero(data == ord("\n")), len(data))
+    return np.diff(np.searchsorted(commas, line_ends), prepend=0).max(initial=8) + 1
+
+
+def tokenize_deck(io_file):
+    """Tokenize the lines of an open deck file into a frame of stripped strings, one column per field"""
+    # memory mapped files are scanned in place, compressed ones are decompressed into memory
+    if isinstance(io_file, mmap.mmap):
+        buffer = io_file
+    else:
+        buffer = io_file.read()
+        io_file = io.BytesIO(buffer)
+    # Line formats can have different numbers of fields, so size the frame for the widest line.
+    raw = pd.read_csv(
+        io_file,
+        engine="c",
+        sep=",",
+        skipinitialspace=True,
+        header=None,
+        names=range(_max_fields(buffer)),
+        dtype=str,
+        na_filter=False,
+        quoting=csv.QUOTE_NONE,
+    )
+    # skipinitialspace only takes care of the leading whitespace, fields repeat a lot
+    #  so the trailing whitespace is stripped from the distinct values of each column
+    for field in raw:
+        codes, uniques = pd.factorize(raw[field])
+        stripped = uniques.str.rstrip()
+        if not stripped.equals(uniques):
+            raw[field] = stripped.to_numpy()[codes]
+    return raw
+
 
 class BaseDeck(ABC):
     @abstractmethod
@@ -16,33 +107,53 @@ class BaseDeck(ABC):
         colnames = ",\t".join(self._colnames)+"\n"
         return colnames+"\n".join([",\t".join(row) for row in self.rows()])
     
-    @cached_property
-    def _colnames(self):
-        return [key for key in vars(self).keys() if not key.startswith("_")]
-    
+    # The columns are whatever __init__ assigned, in order. They are collected once,
+    #  on first use after construction, and the other helpers derive from that.
     @cached_property
     def _columns(self):
-        return [(var, data) for var,data in vars(self).items() if not var.startswith("_")]
+        return tuple((var, data) for var, data in vars(self).items() if not var.startswith("_"))
+
+    @cached_property
+    def _colnames(self):
+        return [var for var, _ in self._columns]
 
     @cached_property
     def _num_columns(self):
-        return len(self._colnames)
+        return len(self._columns)
 
-    def _datacols(self):
-        for _, data in self._columns:
-            yield data
+    @cached_property
+    def _appenders(self):
+        return tuple(data.append for _, data in self._columns)
 
     def from_iterable(self, iterable):
         for row in iterable:
             self.append(row)
 
+    def from_fields(self, fields, columns=None):
+        """Fill the columns from a frame of positional fields, as returned by tokenize_deck.
+           Missing trailing fields are filled with "", fields beyond the deck's columns are dropped.
+           columns limits the filled columns to those names, the others are left empty.
+        """
+        fields = fields.reindex(columns=range(self._num_columns), fill_value="")
+        fields.columns = self._colnames
+        if columns is not None:
+            fields = fields[columns]
+        self.from_dataframe(fields)
+
+    def from_dataframe(self, frame):
+        # columns missing from the frame are left empty and skipped by to_dataframe
+        for name, column in self._columns:
+            if name in frame:
+                column.extend(frame[name].to_numpy())
+
     def rows(self):
-        for row in zip(*list(vars(self).values())):
-            yield row
+        # only the data columns, vars() also holds the cached helpers once they are used
+        yield from zip(*(data for _, data in self._columns))
 
     def append(self, iterable):
-        for col, val in zip_longest(self._datacols(), iterable, fillvalue=""):
-            col.append(val)
+        # short rows are padded with "", extra values are ignored
+        for col_append, val in zip(self._appenders, chain(iterable, repeat(""))):
+            col_append(val)
 
     def __len__(self,):
         return len(self.basin)
@@ -50,11 +161,13 @@ class BaseDeck(ABC):
     def to_dataframe(self):
         columns = {}
         for name, column in self._columns:
+            if not column and len(self):
+                continue
             try:
                 columns[name] = column.pd_parse() 
             except ValueError:
                 print(f"Error parsing column {name}")
-        return pd.DataFrame(columns)
+        return pd.DataFrame(columns, copy=False)
 
 
 class ADeck(BaseDeck):
@@ -81,15 +194,15 @@ class ADeck(BaseDeck):
         self.rmw = NumericColumn()
         self.gusts = NumericColumn()
         self.eye = NumericColumn()
-        self.subregion = StringColumn()
+        self.subregion = CategoricalColumn()
         self.maxseas = NumericColumn()
-        self.initials = StringColumn()
+        self.initials = CategoricalColumn()
         self.direction = NumericColumn()
         self.speed = NumericColumn()
         self.stormname = CategoricalColumn()
-        self.depth = StringColumn()
+        self.depth = CategoricalColumn()
         self.seas = NumericColumn()
-        self.seascode = StringColumn()
+        self.seascode = CategoricalColumn()
         self.seas1 = NumericColumn()
         self.seas2 = NumericColumn()
         self.seas3 = NumericColumn()
@@ -1,25 +1,14 @@
-import gzip
-import re
 from datetime import datetime
-from pathlib import Path
 
 import pandas as pd
 import numpy as np
-from tciopy.atcf.decks import BaseDeck
+from tciopy.atcf.decks import BaseDeck, open_deck, tokenize_deck
 from tciopy.converters import StringColumn, NumericColumn, CategoricalColumn, LatLonColumn, DatetimeColumn
 
 
 
 def read_edeck(fname: str) -> pd.DataFrame:
-    """Read an f-deck file into a pandas DataFrame"""
-    if not isinstance(fname, Path):
-        fname = Path(fname)
-
-    if fname.suffix == ".gz":
-        opener = gzip.open
-    else:
-        opener = open
-
+    """Read an e-deck file into a pandas DataFrame"""
     alldata = {
         "TR": TrackEDeck(), #- track, "03" also accepted for existing old edeck files
         "03": TrackEDeck(), #- track, "03" also accepted for existing old edeck files
@@ -32,16 +21,21 @@ def read_edeck(fname: str) -> pd.DataFrame:
         "GS": GenesisShapeEDeck(), # - TC genesis shape
         "ER": EyewallReplacementEDeck(), # - eyewall replacement
     }
-    with opener(fname, "rt", newline="\n") as io_file:
-        for line in io_file:
-            splitline = re.split(r",\s+", line)
-            ftype = splitline[3]
-            alldata[ftype].append(splitline[:alldata[ftype]._num_columns])
+    with open_deck(fname) as io_file:
+        raw = tokenize_deck(io_file)
+    # route the lines of each format to its deck
+    by_format = raw.groupby(3, sort=False).indices
+    unknown = set(by_format).difference(alldata)
+    if unknown:
+        raise KeyError(f"Unknown e-deck formats: {sorted(unknown)}")
+    for ftype, deck in alldata.items():
+        deck.from_fields(raw.take(by_format.get(ftype, [])))
 
     dfs = [value.to_dataframe() for value in alldata.values()]
     df = pd.concat(dfs, ignore_index=True, sort=False)
     return df
 
+
 #                  ATCF Probability Format         11/2020
 # COMMON FIELDS
 # -------------
@@ -1,5 +1,3 @@
-import gzip
-import re
 import time
 from itertools import zip_longest
 # from collections import defaultdict
@@ -9,22 +7,12 @@ from pathlib import Path
 
 import pandas as pd
 import numpy as np
-from tciopy.atcf.decks import BaseDeck
+from tciopy.atcf.decks import BaseDeck, open_deck, tokenize_deck
 from tciopy.converters import StringColumn, NumericColumn, CategoricalColumn, LatLonColumn, DatetimeColumn
 
-from tciopy.converters import datetimeconverter, int_converter, latlonconverter, categoricalconverter
-
 
 def read_fdeck(fname: str) -> pd.DataFrame:
     """Read an f-deck file into a pandas DataFrame"""
-    if not isinstance(fname, Path):
-        fname = Path(fname)
-
-    if fname.suffix == ".gz":
-        opener = gzip.open
-    else:
-        opener = open
-
     alldata = {
         7: Analysis(),
         6: Dropsonde(),
@@ -34,11 +22,16 @@ def read_fdeck(fname: str) -> pd.DataFrame:
         2: SatelliteDVTO(),
         1: SatelliteDVTS(),
     }
-    with opener(fname, "rt", newline="\n") as io_file:
-        for line in io_file:
-            splitline = re.split(r",\s+", line)
-            ftype = int(splitline[3]) // 10
-            alldata[ftype].append(splitline)
+    with open_deck(fname) as io_file:
+        raw = tokenize_deck(io_file)
+    # route the lines to their deck by the tens digit of the fix type
+    fix_types = pd.to_numeric(raw[3]) // 10
+    unknown = ~fix_types.isin(list(alldata))
+    if unknown.any():
+        raise KeyError(f"Unknown f-deck fix types: {sorted(raw.loc[unknown, 3].unique())}")
+    by_format = raw.groupby(fix_types, sort=False).indices
+    for ftype, deck in alldata.items():
+        deck.from_fields(raw.take(by_format.get(ftype, [])))
 
     dfs = [value.to_dataframe() for value in alldata.values()]
     df = pd.concat(dfs, ignore_index=True, sort=False)
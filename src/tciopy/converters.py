@@ -28,14 +28,12 @@ class NumericColumn(list):
     def pd_parse(self) -> pd.Series:
         "Return a pandas series of the list, converting empty strings to NaNs and scaling output"
         x = np.array(self, dtype=object)
-        mask = (x == "") | (x == "nan")
-        z = np.empty(
-            x.shape,
-            dtype=float,
-        )
-        z[~mask] = x[~mask].astype(float)
-        z[mask] = np.nan
-        return pd.Series(z * self.scale, dtype=float)
+        valid = (x != "") & (x != "nan")
+        z = np.full(x.shape, np.nan)
+        z[valid] = x[valid].astype(float)
+        if self.scale != 1:
+            z *= self.scale
+        return pd.Series(z, dtype=float, copy=False)
 
 
 class CategoricalColumn(list):
@@ -57,10 +55,15 @@ class LatLonColumn(list):
 
     def pd_parse(self) -> pd.Series:
         "Return a pandas series of numerical lat lon values [degrees]"
-        series = pd.Series(np.array(self, dtype=object))
-        hemisign = 1 - series.str.endswith(("W", "S")) * 2
-        ll = NumericColumn(*series.str[:-1]).pd_parse() * hemisign
-        return ll * self.scale
+        # positions repeat across techs and radii lines, so each unique string is parsed once
+        codes, uniques = pd.factorize(np.array(self, dtype=object))
+        uniques = pd.Series(uniques, dtype=object)
+        hemisign = np.where(uniques.str.endswith(("W", "S")), -1, 1)
+        # sign and scale are applied to the uniques, before spreading back out to every row
+        ll = pd.to_numeric(uniques.str[:-1], errors="coerce").to_numpy() * hemisign * self.scale
+        # missing values get code -1, which picks the NaN appended at the end
+        ll = np.append(ll, np.nan)
+        return pd.Series(ll[codes], dtype=float)
 
 
 class DatetimeColumn(list):
@@ -76,50 +79,3 @@ class DatetimeColumn(list):
     def pd_parse(self) -> pd.Series:
         "Return a pandas series of datetimes"
         return pd.to_datetime(pd.Series(self), format=self.datetime_format)
-
-import numpy as np
-import pandas as pd
-
-
-
-class int_converter:
-    def __init__(self, scale=1):
-        self.scale = scale
-
-    def __call__(self, x):
-        mask = (x == "") | (x == "nan")
-        z = np.empty(
-            x.shape,
-            dtype=float,
-        )
-        z[~mask] = x[~mask].astype(float)
-        z[mask] = np.nan
-        return z * self.scale
-
-
-class latlonconverter:
-    def __init__(self, scale):
-        self.scale = scale
-
-    def __call__(self, series):
-        series = pd.Series(series)
-        hemisign = 1 - series.str.endswith(("W", "S")) * 2
-        ll = int_converter()(series.str[:-1]) * hemisign
-        return pd.Series(ll * self.scale)
-
-
-class datetimeconverter:
-    def __init__(self, datetime_format="%Y%m%d%H"):
-        self.datetime_format = datetime_format
-
-    def __call__(self, series):
-        return pd.to_datetime(series, format=self.datetime_format)
-
-
-class categoricalconverter:
-    def __init__(self,):
-        pass
-
-    def __call__(self, series):
-        return pd.Categorical(series)
-
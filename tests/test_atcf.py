@@ -1,7 +1,12 @@
 from pandas.testing import assert_frame_equal
 import tciopy
 import tciopy.atcf
+from tciopy.atcf.edeck import read_edeck
+import bz2
+import gzip
+import lzma
 import pathlib
+import pandas as pd
 import tempfile
 import pytest
 
@@ -24,6 +29,151 @@ def test_circular_atcf(testfile=TEST_FILE):
     assert_frame_equal(atcf, natcf, by_blocks=True)
 
 
+def test_format_adeck_lines_missing_radii(testfile=TEST_FILE):
+    atcf = tciopy.read_adeck(testfile)
+    atcf = atcf.drop(columns=[col for col in atcf.columns if col.startswith(("rad50", "rad64"))])
+    lines = tciopy.atcf.abdeck.format_adeck_lines(atcf)
+    assert len(lines) == len(atcf)
+    assert all(line.split(", ")[11] == " 34" for line in lines)
+
+
+def test_read_adecks(testfile=TEST_FILE):
+    atcf = tciopy.read_adeck(testfile)
+    atcfs = tciopy.read_adecks([testfile, testfile], max_workers=2)
+    assert len(atcfs) == 2 * len(atcf)
+    assert atcfs["tech"].dtype == "category"
+    assert_frame_equal(atcfs.iloc[len(atcf):].reset_index(drop=True), atcf)
+
+
+def test_read_adecks_no_files():
+    with pytest.raises(ValueError):
+        tciopy.read_adecks([])
+
+
+def test_read_adecks_mixed_categories(tmp_path, testfile=TEST_FILE):
+    # a second deck with a tech and stormname the sample deck doesn't have
+    lines = testfile.read_text().splitlines()[:4]
+    other = tmp_path / "aal992023.dat"
+    other.write_text("".join(line.replace("CARQ", "XTRA").replace("INVEST", "ZETA") + "\n" for line in lines))
+    decks = [tciopy.read_adeck(testfile), tciopy.read_adeck(other)]
+    assert "XTRA" not in decks[0]["tech"].cat.categories
+
+    atcfs = tciopy.read_adecks([testfile, other], max_workers=1)
+    assert len(atcfs) == len(decks[0]) + len(decks[1])
+    for col in ("tech", "stormname", "basin"):
+        assert atcfs[col].dtype == "category"
+        expected = pd.concat([deck[col].astype(object) for deck in decks], ignore_index=True)
+        assert atcfs[col].astype(object).equals(expected)
+    assert {"XTRA", "CARQ"} <= set(atcfs["tech"].cat.categories)
+
+
+def test_read_adeck_columns(testfile=TEST_FILE):
+    columns = ["basin", "number", "datetime", "tech", "tau", "lat", "validtime", "rad50_NEQ"]
+    atcf = tciopy.read_adeck(testfile)
+    subset = tciopy.read_adeck(testfile, columns=columns)
+    assert subset.columns.tolist() == columns
+    assert_frame_equal(subset, atcf[columns])
+    subsets = tciopy.read_adecks([testfile, testfile], max_workers=2, columns=columns)
+    assert subsets.columns.tolist() == columns
+    assert tciopy.read_adeck(testfile, columns=["basin", "rad99_NEQ"])["rad99_NEQ"].isna().all()
+    for unknown in ("latt", "rad", "windcode", "rad_NEQ"):
+        with pytest.raises(KeyError):
+            tciopy.read_adeck(testfile, columns=["basin", unknown])
+
+
+def test_adeck_rows():
+    deck = tciopy.atcf.decks.ADeck()
+    deck.append(["AL", "03", "2023060100"])
+    deck.append(["AL", "03", "2023060106", "", "BEST"])
+    rows = list(deck.rows())
+    assert len(rows) == 2
+    assert all(len(row) == len(deck._colnames) for row in rows)
+    assert rows[1][:5] == ("AL", "03", "2023060106", "", "BEST")
+
+
+@pytest.mark.parametrize("suffix, compress", [(".gz", gzip.compress), (".bz2", bz2.compress), (".xz", lzma.compress)])
+def test_read_compressed_adeck(tmp_path, suffix, compress, testfile=TEST_FILE):
+    compressed = tmp_path / f"{testfile.name}{suffix}"
+    compressed.write_bytes(compress(testfile.read_bytes()))
+    assert_frame_equal(tciopy.read_adeck(compressed), tciopy.read_adeck(testfile))
+
+
+@pytest.mark.parametrize("wide_line", [0, 1])
+def test_read_adeck_wide_lines(tmp_path, wide_line, testfile=TEST_FILE):
+    # a full 45 field line with trailing fields beyond the adeck columns
+    lines = testfile.read_text().splitlines()[:2]
+    narrow = tmp_path / "aal032023.dat"
+    narrow.write_text("\n".join(lines) + "\n")
+    fields = lines[wide_line].rstrip(", ").split(", ")
+    lines[wide_line] = ", ".join(fields + [""] * (45 - len(fields)) + ["EXTRA", ""])
+    wide = tmp_path / "aal032023_wide.dat"
+    wide.write_text("\n".join(lines) + "\n")
+
+    atcf = tciopy.read_adeck(wide)
+    assert len(atcf) == 2
+    assert_frame_equal(atcf, tciopy.read_adeck(narrow))
+
+
+@pytest.mark.parametrize("reader", [tciopy.read_adeck, tciopy.read_fdeck, read_edeck])
+def test_read_malformed_deck(tmp_path, reader):
+    # the parse error, not a BufferError from closing the memory map, reaches the caller
+    malformed = tmp_path / "aal032023.dat"
+    malformed.write_bytes(b"AL, 03, 2023061700, 01, CARQ, -24,  88N,  217W,  15,    0, \xff\xfe,\n")
+    with pytest.raises(UnicodeDecodeError):
+        reader(malformed)
+
+
+def test_read_empty_adeck(tmp_path):
+    empty = tmp_path / "aal992023.dat"
+    empty.touch()
+    atcf = tciopy.read_adeck(empty)
+    assert len(atcf) == 0
+    assert "validtime" in atcf
+
+
+def test_read_edeck(tmp_path):
+    edeck = tmp_path / "eal202023.dat"
+    edeck.write_text(
+        "AL, 20, 2023101100, TR, OFCL,  12, 150N,  450W,  67,  100, , 180, , 50, 60, 1, -2 \n"
+        "AL, 20, 2023101100, 03, OFCL,  24, 160N,  460W,  67,  110, , 180, , 50, 60, 1, -2\r\n"
+        "AL, 20, 2023101100, IN, OFCL,  12, 150N,  450W,  50,   45, TS,   5, extra, extra\n"
+    )
+    deck = read_edeck(edeck)
+    assert deck["format"].tolist() == ["TR", "03", "IN"]
+    assert deck["lat"].tolist() == [15.0, 16.0, 15.0]
+    assert deck["bias_along"].tolist()[:2] == [-2.0, -2.0]
+    assert deck["ty"].tolist() == ["", "", "TS"]
+    assert deck["half_range"].tolist()[2] == 5.0
+
+
+def test_read_edeck_unknown_format(tmp_path):
+    edeck = tmp_path / "eal202023.dat"
+    edeck.write_text(
+        "AL, 20, 2023101100, TR, OFCL,  12, 150N,  450W,  67,  100, , 180, , 50, 60, 1, -2\n"
+        "AL, 20, 2023101100, ZZ, OFCL,  12, 150N,  450W,  67\n"
+    )
+    with pytest.raises(KeyError, match="ZZ"):
+        read_edeck(edeck)
+
+def test_read_fdeck():
+    fdeck_file = TEST_FILE.parent / "fal132023.dat"
+    fdeck = tciopy.read_fdeck(fdeck_file)
+    with open(fdeck_file) as lines:
+        assert len(fdeck) == sum(1 for _ in lines)
+    # lines of each fix type go to their own deck, in deck order
+    assert fdeck["format"].unique().tolist() == [70, 60, 50, 40, 30, 31, 20, 10]
+
+
+@pytest.mark.parametrize("fix_type", ["80", ""])
+def test_read_fdeck_unknown_fix_type(tmp_path, fix_type):
+    lines = (TEST_FILE.parent / "fal132023.dat").read_text().splitlines()[:2]
+    fields = lines[1].split(",")
+    fields[3] = f" {fix_type}"
+    fdeck = tmp_path / "fal132023.dat"
+    fdeck.write_text(lines[0] + "\n" + ",".join(fields) + "\n")
+    with pytest.raises(KeyError, match="fix types"):
+        tciopy.read_fdeck(fdeck)
+
 if __name__ == "__main__":
     pytest.main()
     # print("All tests passed")
@@ -88,6 +88,29 @@ def test_latlon_column_scaled():
     pd.testing.assert_series_equal(ret_series, exp_series)
 
 
+def test_latlon_column_empty():
+    col = converters.LatLonColumn()
+    col.append("100N")
+    col.append("")
+    col.append("100W")
+
+    ret_series = col.pd_parse()
+    exp_series = pd.Series([10.0, np.nan, -10.0], dtype=float)
+    pd.testing.assert_series_equal(ret_series, exp_series)
+
+
+def test_latlon_column_missing():
+    col = converters.LatLonColumn()
+    col.append("100N")
+    col.append(np.nan)
+    col.append("200S")
+    col.append(None)
+
+    ret_series = col.pd_parse()
+    exp_series = pd.Series([10.0, np.nan, -20.0, np.nan], dtype=float)
+    pd.testing.assert_series_equal(ret_series, exp_series)
+
+
 def test_datetime_column_defaultfmt():
     col = converters.DatetimeColumn()
     col.append("2021010100")